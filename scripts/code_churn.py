@@ -3,6 +3,10 @@ import csv
 import datetime
 import os
 import logging
+import tempfile
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
 
 # Set up logging
 logging.basicConfig(
@@ -17,72 +21,82 @@ default_period = datetime.datetime.now() - datetime.timedelta(days=30)
 # Function to get the git log with file changes (added, removed, modified)
 def get_git_log(since_date):
     try:
-        logging.info(f"Fetching git log since {since_date}")
+        logger.info(f"Fetching git log since {since_date}")
         git_log_command = [
-            "git", "log", "--since", since_date, "--pretty=format:'%H,%ad,%s'", "--numstat"
+            "git", "log", "--since", since_date, "--pretty=format:%H%x1f%ad%x1f%s%x1e", "--numstat",
+            # Churn only sums added/removed lines, so skip rename detection
+            "--no-renames"
         ]
         
-        result = subprocess.run(git_log_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        if result.returncode != 0:
-            logging.error(f"Error running git command: {result.stderr.decode('utf-8')}")
-            raise Exception(f"Error running git command: {result.stderr.decode('utf-8')}")
+        # Stream the log line by line rather than buffering the whole output. Lines stay
+        # as bytes: numstat rows are pure ASCII, so only commit headers get decoded
+        # stderr goes to a temp file so git can never block on a full stderr pipe
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(git_log_command, stdout=subprocess.PIPE, stderr=stderr_file)
+            for line in process.stdout:
+                yield line.rstrip(b"\n")
+            
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode('utf-8', 'replace')
+                logger.error(f"Error running git command: {stderr}")
+                raise Exception(f"Error running git command: {stderr}")
         
-        logging.info(f"Successfully fetched git log.")
-        return result.stdout.decode('utf-8')
+        logger.info(f"Successfully fetched git log.")
     except Exception as e:
-        logging.error(f"Failed to fetch git log: {str(e)}")
+        logger.error(f"Failed to fetch git log: {str(e)}")
         raise
 
-# Function to safely convert values to integers, handling cases where values are not numbers
-def safe_int(value):
-    try:
-        return int(value)
-    except ValueError:
-        return 0
-
-# Function to parse the git log output
-def parse_git_log(git_log_output):
+# Function to parse the git log output (any iterable of byte lines)
+def parse_git_log(commit_lines):
     commit_data = []
-    commit_lines = git_log_output.splitlines()
     
     commit_info = {}
     total_added = 0
     total_removed = 0
     
+    # Checked once so the per-line debug calls cost nothing when debug logging is off
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    
     for line in commit_lines:
-        # Check for commit header
-        if line.startswith("'"):
+        # Commit headers end with the record separator; fields are split by the unit separator
+        if line.endswith(b"\x1e"):
             # If there's previous commit data, store it
             if commit_info:
                 commit_info['added_lines'] = total_added
                 commit_info['removed_lines'] = total_removed
                 commit_data.append(commit_info)
-                logging.debug(f"Stored commit: {commit_info}")
+                if debug_enabled:
+                    logger.debug("Stored commit: %s", commit_info)
 
             # Parse commit header (commit ID, date, message)
-            parts = line.strip("'").split(",", 3)
+            commit_id, date, message = line[:-1].split(b"\x1f", 2)
             commit_info = {
-                "commit_id": parts[0],
-                "date": parts[1],  # Extracted date properly now
-                "message": parts[2]
+                "commit_id": commit_id.decode('ascii'),
+                "date": date.decode('utf-8', 'replace'),
+                "message": message.decode('utf-8', 'replace')
             }
             total_added = 0
             total_removed = 0
-            logging.debug(f"Parsed commit header: {commit_info}")
+            if debug_enabled:
+                logger.debug("Parsed commit header: %s", commit_info)
         
         # Process file change stats
         else:
-            parts = line.split("\t")
-            if len(parts) == 3:  # Only process if the line is well-formed
-                added = safe_int(parts[0])
-                removed = safe_int(parts[1])
-                file_name = parts[2]
+            # partition avoids building a list for every numstat row
+            added, _, rest = line.partition(b"\t")
+            removed, sep, file_name = rest.partition(b"\t")
+            if sep:  # Only process if the line is well-formed
+                # Binary files report "-" instead of line counts
+                added = int(added) if added.isdigit() else 0
+                removed = int(removed) if removed.isdigit() else 0
                 total_added += added
                 total_removed += removed
-                logging.debug(f"File changed: {added} added, {removed} removed, {file_name}")
+                if debug_enabled:
+                    logger.debug("File changed: %s added, %s removed, %s",
+                                 added, removed, file_name.decode('utf-8', 'replace'))
             else:
-                logging.warning(f"Skipping malformed line: {line}")
+                logger.warning("Skipping malformed line: %s", line.decode('utf-8', 'replace'))
     
     # Add the last commit data
     if commit_info:
@@ -90,31 +104,23 @@ def parse_git_log(git_log_output):
         commit_info['removed_lines'] = total_removed
         commit_data.append(commit_info)
     
-    logging.info(f"Parsed {len(commit_data)} commits.")
+    logger.info(f"Parsed {len(commit_data)} commits.")
     return commit_data
 
 # Function to save commit data to CSV
 def save_to_csv(commit_data, file_name="commit_churn.csv"):
     try:
         header = ["commit_id", "date", "message", "added_lines", "removed_lines"]
-        logging.info(f"Saving commit data to {file_name}")
+        logger.info(f"Saving commit data to {file_name}")
 
-        with open(file_name, mode='w', newline='') as file:
+        with open(file_name, mode='w', newline='', buffering=1 << 20) as file:
             writer = csv.writer(file)
             writer.writerow(header)
-            
-            for commit in commit_data:
-                writer.writerow([
-                    commit["commit_id"],
-                    commit["date"],
-                    commit["message"],
-                    commit["added_lines"],
-                    commit["removed_lines"]
-                ])
+            writer.writerows(map(itemgetter(*header), commit_data))
         
-        logging.info(f"Data successfully saved to {file_name}")
+        logger.info(f"Data successfully saved to {file_name}")
     except Exception as e:
-        logging.error(f"Error saving data to CSV: {str(e)}")
+        logger.error(f"Error saving data to CSV: {str(e)}")
         raise
 
 # Main function to execute the script
@@ -122,18 +128,18 @@ def main():
     try:
         # Get the period (default to 1 month ago)
         since_date = default_period.strftime("%Y-%m-%d")
-        logging.info(f"Using default period: {since_date}")
+        logger.info(f"Using default period: {since_date}")
         
-        # Get the git log output
-        git_log_output = get_git_log(since_date)
+        # Stream the git log output
+        git_log_lines = get_git_log(since_date)
         
-        # Parse the git log output
-        commit_data = parse_git_log(git_log_output)
+        # Parse the git log output as it arrives
+        commit_data = parse_git_log(git_log_lines)
         
         # Save the parsed data to CSV
         save_to_csv(commit_data)
     except Exception as e:
-        logging.error(f"Script failed: {str(e)}")
+        logger.error(f"Script failed: {str(e)}")
 
 # Run the script
 if __name__ == "__main__":
@@ -2,8 +2,12 @@ import subprocess
 import csv
 import datetime
 import logging
+import tempfile
 import argparse
 import os
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
 
 # Function to get the current active branch
 def get_current_branch():
@@ -12,161 +16,146 @@ def get_current_branch():
         current_branch = subprocess.check_output(['git', 'rev-parse', '--abbrev-ref', 'HEAD']).strip().decode('utf-8')
         return current_branch
     except subprocess.CalledProcessError as e:
-        logging.error(f"Failed to get current branch: {e}")
+        logger.error(f"Failed to get current branch: {e}")
         return None
 
-# Function to safely convert values to integers, handling cases where values are not numbers
-def safe_int(value):
-    try:
-        return int(value)
-    except ValueError:
-        return 0
-
-# Function to get the actual number of modified lines, considering merge commits
-def get_modified_lines(commit_id):
+# Function to write or incrementally refresh Git's commit-graph
+def ensure_commit_graph():
+    # A commit-graph lets git log/rev-list walk history without parsing every commit
+    # object; on large repositories this can cut log queries from seconds to milliseconds
     try:
-        # Check if the commit is a merge commit by using git show
-        merge_check_command = ["git", "show", "--no-patch", "--pretty=%P", commit_id]
-        result = subprocess.run(merge_check_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        if result.returncode != 0:
-            logging.error(f"Error checking commit for merge status: {result.stderr.decode('utf-8')}")
-            return 0
-
-        parent_commits = result.stdout.decode('utf-8').strip()
-        # If there are two parent commits, it's a merge commit
-        if len(parent_commits.split()) == 2:
-            # Merge commit, diff with both parents
-            diff_command = ["git", "diff", "--numstat", f"{commit_id}^1..{commit_id}^2"]
+        graph_paths = subprocess.check_output(
+            ['git', 'rev-parse', '--git-path', 'objects/info/commit-graph', '--git-path', 'objects/info/commit-graphs']
+        ).decode('utf-8').splitlines()
+        if any(os.path.exists(path) for path in graph_paths):
+            logger.debug("Refreshing commit-graph with any new commits.")
         else:
-            # Not a merge commit, diff with the single parent
-            diff_command = ["git", "diff", "--numstat", f"{commit_id}^"]
+            logger.info("Writing a commit-graph into .git to speed up git log queries. "
+                        "The first write can take a while on large repositories.")
 
-        # Run the diff command
-        result = subprocess.run(diff_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
+        # --split only adds a layer for commits the existing graph does not cover yet,
+        # so this stays cheap on repeat runs while keeping the graph fresh
+        result = subprocess.run(['git', 'commit-graph', 'write', '--reachable', '--split', '--no-progress'],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         if result.returncode != 0:
-            logging.error(f"Error running diff command for commit {commit_id}: {result.stderr.decode('utf-8')}")
-            return 0
-        
-        diff_output = result.stdout.decode('utf-8')
-        modified_lines = 0
-        
-        # Process each file change in the diff output
-        for line in diff_output.splitlines():
-            parts = line.split("\t")
-            if len(parts) == 3:
-                added, removed, _ = parts
-                # Actual modifications are added + removed lines
-                modified_lines += safe_int(added) + safe_int(removed)
-        
-        logging.debug(f"Modified lines in commit {commit_id}: {modified_lines}")
-        return modified_lines
+            logger.warning(f"Failed to write commit-graph: {result.stderr.decode('utf-8')}")
     except Exception as e:
-        logging.error(f"Error getting modified lines for commit {commit_id}: {str(e)}")
-        return 0
+        logger.warning(f"Failed to write commit-graph: {str(e)}")
 
 # Function to fetch the git log based on the provided start and end dates and branch
 def get_git_log(branch, start_date, end_date):
     try:
-        logging.info(f"Fetching git log for branch {branch} from {start_date} to {end_date}")
+        logger.info(f"Fetching git log for branch {branch} from {start_date} to {end_date}")
         git_log_command = [
             "git", "log", f"{branch}", "--since", start_date, "--until", end_date,
-            "--pretty=format:'%H,%ad,%s'", "--numstat"
+            "--pretty=format:%H%x1f%aI%x1f%at%x1f%s%x1e", "--numstat",
+            # Churn only sums added/removed lines, so skip rename detection
+            "--no-renames",
+            # Roughly oldest first, so the final sort by author date has little to do
+            "--date-order", "--reverse"
         ]
         
-        result = subprocess.run(git_log_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        if result.returncode != 0:
-            logging.error(f"Error running git command: {result.stderr.decode('utf-8')}")
-            raise Exception(f"Error running git command: {result.stderr.decode('utf-8')}")
+        # Stream the log line by line rather than buffering the whole output. Lines stay
+        # as bytes: numstat rows are pure ASCII, so only commit headers get decoded
+        # stderr goes to a temp file so git can never block on a full stderr pipe
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(git_log_command, stdout=subprocess.PIPE, stderr=stderr_file)
+            for line in process.stdout:
+                yield line.rstrip(b"\n")
+            
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode('utf-8', 'replace')
+                logger.error(f"Error running git command: {stderr}")
+                raise Exception(f"Error running git command: {stderr}")
         
-        logging.info(f"Successfully fetched git log.")
-        return result.stdout.decode('utf-8')
+        logger.info(f"Successfully fetched git log.")
     except Exception as e:
-        logging.error(f"Failed to fetch git log: {str(e)}")
+        logger.error(f"Failed to fetch git log: {str(e)}")
         raise
 
-# Function to parse the git log output
-def parse_git_log(git_log_output):
+# Function to parse the git log output (any iterable of byte lines)
+def parse_git_log(commit_lines):
     commit_data = []
-    commit_lines = git_log_output.splitlines()
     
     commit_info = {}
     total_added = 0
     total_removed = 0
     
+    # Checked once so the per-line debug calls cost nothing when debug logging is off
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    
     for line in commit_lines:
-        # Check for commit header
-        if line.startswith("'"):
+        # Commit headers end with the record separator; fields are split by the unit separator
+        if line.endswith(b"\x1e"):
             # If there's previous commit data, store it
             if commit_info:
                 commit_info['added_lines'] = total_added
                 commit_info['removed_lines'] = total_removed
-                commit_info['modified_lines'] = get_modified_lines(commit_info['commit_id'])  # Get actual modified lines
+                commit_info['modified_lines'] = total_added + total_removed
                 commit_data.append(commit_info)
-                logging.debug(f"Stored commit: {commit_info}")
+                if debug_enabled:
+                    logger.debug("Stored commit: %s", commit_info)
 
-            # Parse commit header (commit ID, date, message)
-            parts = line.strip("'").split(",", 3)
+            # Parse commit header (commit ID, date, author timestamp, message)
+            commit_id, date, timestamp, message = line[:-1].split(b"\x1f", 3)
             commit_info = {
-                "commit_id": parts[0],
-                "date": parts[1],  # Extracted date properly now
-                "message": parts[2]
+                "commit_id": commit_id.decode('ascii'),
+                "date": date.decode('utf-8', 'replace'),
+                "timestamp": int(timestamp),  # Sort key only, not written to the CSV
+                "message": message.decode('utf-8', 'replace')
             }
             total_added = 0
             total_removed = 0
-            logging.debug(f"Parsed commit header: {commit_info}")
+            if debug_enabled:
+                logger.debug("Parsed commit header: %s", commit_info)
         
         # Process file change stats
         else:
-            parts = line.split("\t")
-            if len(parts) == 3:  # Only process if the line is well-formed
-                added = safe_int(parts[0])
-                removed = safe_int(parts[1])
-                file_name = parts[2]
+            # partition avoids building a list for every numstat row
+            added, _, rest = line.partition(b"\t")
+            removed, sep, file_name = rest.partition(b"\t")
+            if sep:  # Only process if the line is well-formed
+                # Binary files report "-" instead of line counts
+                added = int(added) if added.isdigit() else 0
+                removed = int(removed) if removed.isdigit() else 0
                 total_added += added
                 total_removed += removed
-                logging.debug(f"File changed: {added} added, {removed} removed, {file_name}")
+                if debug_enabled:
+                    logger.debug("File changed: %s added, %s removed, %s",
+                                 added, removed, file_name.decode('utf-8', 'replace'))
             else:
-                logging.warning(f"Skipping malformed line: {line}")
+                logger.warning("Skipping malformed line: %s", line.decode('utf-8', 'replace'))
     
     # Add the last commit data
     if commit_info:
         commit_info['added_lines'] = total_added
         commit_info['removed_lines'] = total_removed
-        commit_info['modified_lines'] = get_modified_lines(commit_info['commit_id'])  # Get actual modified lines
+        commit_info['modified_lines'] = total_added + total_removed
         commit_data.append(commit_info)
     
-    logging.info(f"Parsed {len(commit_data)} commits.")
+    logger.info(f"Parsed {len(commit_data)} commits.")
     return commit_data
 
 # Function to save commit data to CSV
 def save_to_csv(commit_data, file_name="commit_churn.csv"):
     try:
         header = ["commit_id", "date", "message", "added_lines", "removed_lines", "modified_lines"]
-        logging.info(f"Saving commit data to {file_name}")
+        logger.info(f"Saving commit data to {file_name}")
 
-        # Sort commit data by date (oldest first)
-        commit_data.sort(key=lambda x: x["date"])
+        # Sort by author date (oldest first). git orders by committer date, which differs
+        # after rebases and amends, and ISO strings with different offsets don't sort
+        # chronologically, so sort on the Unix timestamp instead
+        commit_data.sort(key=itemgetter("timestamp"))
         
-        with open(file_name, mode='w', newline='') as file:
+        with open(file_name, mode='w', newline='', buffering=1 << 20) as file:
             writer = csv.writer(file)
             writer.writerow(header)
-            
-            for commit in commit_data:
-                writer.writerow([
-                    commit["commit_id"],
-                    commit["date"],
-                    commit["message"],
-                    commit["added_lines"],
-                    commit["removed_lines"],
-                    commit["modified_lines"]
-                ])
+            writer.writerows(map(itemgetter(*header), commit_data))
         
-        logging.info(f"Data successfully saved to {file_name}")
+        logger.info(f"Data successfully saved to {file_name}")
     except Exception as e:
-        logging.error(f"Error saving data to CSV: {str(e)}")
+        logger.error(f"Error saving data to CSV: {str(e)}")
         raise
 
 # Argument Parsing
@@ -180,6 +169,8 @@ def parse_arguments():
     parser.add_argument('--log-file', type=str, default=None, help="Log file name (default: off)")
     parser.add_argument('--log-level', type=str, default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], 
                         help="Logging level (default: INFO)")
+    parser.add_argument('--prewarm', action='store_true',
+                        help="Write or refresh the repository's commit-graph in .git before analysing (default: off)")
     
     return parser.parse_args()
 
@@ -206,16 +197,20 @@ def main():
     setup_logging(log_file=log_file, log_level=args.log_level)
 
     try:
-        # Fetch the git log for the given parameters
-        git_log_output = get_git_log(args.branch, args.start_date, args.end_date)
+        # Optionally let git use an up-to-date commit-graph for the log walk
+        if args.prewarm:
+            ensure_commit_graph()
+        
+        # Stream the git log for the given parameters
+        git_log_lines = get_git_log(args.branch, args.start_date, args.end_date)
         
-        # Parse the git log output
-        commit_data = parse_git_log(git_log_output)
+        # Parse the git log output as it arrives
+        commit_data = parse_git_log(git_log_lines)
         
         # Save the parsed data to CSV
         save_to_csv(commit_data, f"{args.branch}_{args.start_date}_{args.end_date}_commit_churn.csv")
     except Exception as e:
-        logging.error(f"Script failed: {str(e)}")
+        logger.error(f"Script failed: {str(e)}")
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,22 @@
 import subprocess
 import argparse
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing.util import Finalize
+
+# Persistent `git cat-file --batch` process, started lazily in each worker process
+_cat_file = None
+
+def positive_int(value):
+    """Parse a command-line value as an integer of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 def configure_logging(log_level, log_file):
     """Configure logging based on user preferences."""
@@ -22,6 +36,25 @@ def run_git_command(command):
         logging.error(f"Error running command: {' '.join(command)}\n{e.stderr}")
         return None
 
+def ensure_commit_graph():
+    """Write Git's commit-graph, or add any new commits to the existing one."""
+    # A commit-graph lets rev-list, merge-base and branch --merged walk history without
+    # parsing every commit object, which is much faster on large repositories
+    graph_paths = run_git_command(["git", "rev-parse", "--git-path", "objects/info/commit-graph",
+                                   "--git-path", "objects/info/commit-graphs"])
+    if graph_paths and any(os.path.exists(path) for path in graph_paths.splitlines()):
+        logging.debug("Refreshing commit-graph with any new commits.")
+    else:
+        logging.info("Writing a commit-graph into .git to speed up branch analysis. "
+                     "The first write can take a while on large repositories.")
+
+    # --split only adds a layer for commits the existing graph does not cover yet,
+    # so this stays cheap on repeat runs while keeping the graph fresh
+    result = subprocess.run(["git", "commit-graph", "write", "--reachable", "--split", "--no-progress"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        logging.warning(f"Failed to write commit-graph: {result.stderr.strip()}")
+
 def detect_default_branch():
     """Detect the default branch of the repository."""
     default_branch = run_git_command(["git", "symbolic-ref", "refs/remotes/origin/HEAD"])
@@ -43,6 +76,50 @@ def get_all_branches():
     logging.warning("No branches found or unable to fetch branches.")
     return []
 
+def get_cat_file():
+    """Return this process's long-running git cat-file process, starting it if needed."""
+    global _cat_file
+    if _cat_file is None or _cat_file.poll() is not None:
+        logging.debug("Starting git cat-file --batch process.")
+        _cat_file = subprocess.Popen(["git", "cat-file", "--batch"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        # Pool workers exit without running atexit hooks, but they do run multiprocessing
+        # finalizers (as does the main process at exit), so close the process from there
+        Finalize(None, close_cat_file, exitpriority=10)
+    return _cat_file
+
+def close_cat_file():
+    """Close this process's git cat-file process and wait for it to exit."""
+    global _cat_file
+    if _cat_file is not None:
+        _cat_file.stdin.close()
+        _cat_file.wait()
+        _cat_file.stdout.close()
+        _cat_file = None
+
+def get_commit_date(commit_hash):
+    """Get the committer date of a commit from the persistent cat-file process."""
+    cat_file = get_cat_file()
+    cat_file.stdin.write(f"{commit_hash}\n".encode())
+    cat_file.stdin.flush()
+
+    header = cat_file.stdout.readline().split()
+    if len(header) != 3 or header[1] != b"commit":
+        logging.error(f"Unable to read commit object: {commit_hash}")
+        return None
+
+    # Read the object body plus its trailing newline so the next lookup starts cleanly
+    body = cat_file.stdout.read(int(header[2]) + 1)
+    for line in body.decode("utf-8", "replace").splitlines():
+        if line.startswith("committer "):
+            # committer <name> <email> <unix timestamp> <+hhmm offset>
+            timestamp, offset = line.rsplit(" ", 2)[1:]
+            sign = -1 if offset[0] == "-" else 1
+            tz = timezone(sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+            return datetime.fromtimestamp(int(timestamp), tz)
+        if not line:
+            break  # End of the commit headers
+    return None
+
 def get_branch_creation_date(branch, default_branch):
     """Get the creation date of a branch."""
     logging.debug(f"Fetching creation date for branch: {branch}")
@@ -50,10 +127,10 @@ def get_branch_creation_date(branch, default_branch):
     first_unique_commit = run_git_command(["git", "rev-list", "--boundary", branch, f"^{default_branch}", "--reverse", "--max-parents=1"])
     if first_unique_commit:
         first_commit_hash = first_unique_commit.splitlines()[0].lstrip('-')  # Strip the boundary marker
-        commit_date = run_git_command(["git", "show", "-s", "--format=%ci", first_commit_hash])
+        commit_date = get_commit_date(first_commit_hash)
         if commit_date:
             logging.debug(f"Branch {branch} creation date: {commit_date}")
-            return datetime.strptime(commit_date, "%Y-%m-%d %H:%M:%S %z")
+            return commit_date
         logging.warning(f"No valid commit date found for branch: {branch}")
     else:
         logging.warning(f"No unique commits found for branch: {branch}")
@@ -70,15 +147,36 @@ def get_branch_parent(branch, default_branch):
     logging.warning(f"Unable to determine parent branch for: {branch}")
     return None
 
-def has_branch_merged(branch):
-    """Check if the branch has been merged back to its parent."""
-    logging.debug(f"Checking if branch {branch} has been merged.")
-    merged_branches = run_git_command(["git", "branch", "--merged"])
-    if merged_branches and branch in merged_branches:
-        logging.debug(f"Branch {branch} has been merged.")
-        return True
-    logging.debug(f"Branch {branch} has not been merged.")
-    return False
+def get_merged_branches(default_branch):
+    """Get the set of branches that have been merged into the default branch."""
+    logging.debug(f"Fetching branches merged into {default_branch}.")
+    merged_branches = run_git_command(["git", "branch", "--merged", default_branch, "--no-color"])
+    if merged_branches:
+        return frozenset(branch.strip("* ").strip() for branch in merged_branches.splitlines())
+    return frozenset()
+
+def analyse_branch(branch, default_branch, merged_branches, start_date, end_date):
+    """Analyse a single branch and return its CSV row, or None if it is out of range."""
+    logging.debug(f"Analysing branch: {branch}")
+    created_date = get_branch_creation_date(branch, default_branch)
+    if created_date:
+        created_date_naive = created_date.replace(tzinfo=None)  # Make offset-naive for comparison
+        if not (start_date <= created_date_naive <= end_date):
+            logging.debug(f"Branch {branch} creation date {created_date_naive} is outside date range.")
+            return None
+
+    parent_branch = get_branch_parent(branch, default_branch)
+    merged = branch in merged_branches
+
+    if created_date:
+        age_days = (datetime.now() - created_date.replace(tzinfo=None)).days
+        created_str = created_date.strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        age_days = "N/A"
+        created_str = "N/A"
+
+    logging.debug(f"Branch: {branch}, Parent: {parent_branch}, Created: {created_str}, Age: {age_days}, Merged: {merged}")
+    return [branch, parent_branch or 'Unknown', created_str, age_days, str(merged)]
 
 def main():
     parser = argparse.ArgumentParser(description="Analyse Git branches.")
@@ -92,6 +190,10 @@ def main():
                         help="Logging level. Default: INFO.")
     parser.add_argument("--log-file", help="Log file to write logs. If specified, terminal logging is disabled.")
     parser.add_argument("--output", help="CSV file to save branch analysis. Default: repo_name_startdate_enddate.csv")
+    parser.add_argument("--jobs", type=positive_int, default=os.cpu_count() or 1,
+                        help="Number of worker processes used to analyse branches. Default: CPU count.")
+    parser.add_argument("--prewarm", action="store_true",
+                        help="Write or refresh the repository's commit-graph in .git before analysing. Default: off.")
 
     args = parser.parse_args()
     configure_logging(args.log_level, args.log_file)
@@ -101,6 +203,9 @@ def main():
 
     logging.info(f"Starting branch analysis for date range: {start_date} to {end_date}")
 
+    if args.prewarm:
+        ensure_commit_graph()
+
     default_branch = detect_default_branch()
     if not default_branch:
         logging.error("Default branch detection failed. Exiting.")
@@ -122,33 +227,24 @@ def main():
 
     output_file = args.output or f"{repo_name}_{start_date.date()}_{end_date.date()}.csv"
 
-    data = []
-
+    local_branches = []
     for branch in branches:
-        logging.debug(f"Analysing branch: {branch}")
         if "remotes/" in branch:  # Skip remote branches for simplicity
             logging.debug(f"Skipping remote branch: {branch}")
             continue
+        local_branches.append(branch)
+
+    # Fetch merge status for every branch once rather than once per branch
+    merged_branches = get_merged_branches(default_branch)
 
-        created_date = get_branch_creation_date(branch, default_branch)
-        if created_date:
-            created_date_naive = created_date.replace(tzinfo=None)  # Make offset-naive for comparison
-            if not (start_date <= created_date_naive <= end_date):
-                logging.debug(f"Branch {branch} creation date {created_date_naive} is outside date range.")
-                continue
-
-        parent_branch = get_branch_parent(branch, default_branch)
-        merged = has_branch_merged(branch)
-
-        if created_date:
-            age_days = (datetime.now() - created_date.replace(tzinfo=None)).days
-            created_str = created_date.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            age_days = "N/A"
-            created_str = "N/A"
-
-        logging.debug(f"Branch: {branch}, Parent: {parent_branch}, Created: {created_str}, Age: {age_days}, Merged: {merged}")
-        data.append([branch, parent_branch or 'Unknown', created_str, age_days, str(merged)])
+    # Each branch only needs its own git subprocesses, so analyse them in parallel
+    analyse = partial(analyse_branch, default_branch=default_branch, merged_branches=merged_branches,
+                      start_date=start_date, end_date=end_date)
+    # Workers started with spawn/forkserver don't inherit the logging setup, so configure it in each
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=configure_logging,
+                             initargs=(args.log_level, args.log_file)) as executor:
+        rows = executor.map(analyse, local_branches)
+        data = [row for row in rows if row is not None]
 
     if data:
         logging.info(f"Saving analysis to {output_file}")
@@ -1,10 +1,22 @@
 import os
+import re
 import logging
+import subprocess
+import tempfile
 from datetime import datetime
-from git import Repo
 from azure.devops.connection import Connection
+from azure.devops.released.git import GitPullRequestSearchCriteria
 from msrest.authentication import BasicAuthentication
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Issue references in commit messages (e.g., #1234)
+ISSUE_REF_PATTERN = re.compile(r"#(\d+)")
+
+# Pull requests requested per page, and pages fetched concurrently after the first
+PR_PAGE_SIZE = 1000
+PR_FETCH_WORKERS = 8
 
 # Configure logging
 def setup_logging(log_file=None, log_level=logging.WARNING):
@@ -16,41 +28,59 @@ def setup_logging(log_file=None, log_level=logging.WARNING):
     else:
         logging.basicConfig(level=log_level, format=log_format)
 
+# Function to turn one record of the git log stream into a metrics entry
+def parse_commit_record(record):
+    """Parse a NUL-terminated git log record into a commit metrics dict."""
+    _, committed_date, author, source, message = record.decode("utf-8", "replace").split("\x1f", 4)
+    message = message.strip()
+
+    issue_match = ISSUE_REF_PATTERN.search(message)
+
+    return {
+        "branch": source[len("refs/heads/"):] if source.startswith("refs/heads/") else source,
+        "commit_date": datetime.fromtimestamp(int(committed_date)),
+        "author": author,
+        "message": message,
+        "issue_ref": issue_match.group(1) if issue_match else None,
+    }
+
 # Function to calculate lead time and time to resolve issues
 def calculate_git_metrics(repo_path):
     """Calculate metrics from Git repository commits."""
     logger = logging.getLogger("calculate_git_metrics")
 
     try:
-        repo = Repo(repo_path)
-        if repo.bare:
+        is_bare = subprocess.run(["git", "-C", repo_path, "rev-parse", "--is-bare-repository"],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if is_bare.returncode != 0 or is_bare.stdout.strip() == "true":
             logger.error("Invalid Git repository.")
             return []
 
         logger.info("Calculating Git metrics...")
         metrics = []
 
-        for branch in repo.branches:
-            logger.debug(f"Analysing branch: {branch.name}")
-            for commit in repo.iter_commits(branch):
-                commit_date = datetime.fromtimestamp(commit.committed_date)
-                author = commit.author.name
-                message = commit.message.strip()
-
-                # Safely check if the commit references an issue (e.g., #1234)
-                issue_ref = None
-                if "#" in message:
-                    parts = message.split("#", 1)
-                    if len(parts) > 1 and parts[1].strip():
-                        issue_ref = parts[1].split()[0]
-
-                metrics.append({
-                    "branch": branch.name,
-                    "commit_date": commit_date,
-                    "author": author,
-                    "message": message,
-                    "issue_ref": issue_ref,
-                })
+        # One git log over every local branch; --source records the branch each commit
+        # was reached from, and every commit is listed once even if shared by branches
+        git_log_command = [
+            "git", "-C", repo_path, "log", "--branches", "--source", "-z",
+            "--pretty=format:%H%x1f%ct%x1f%an%x1f%S%x1f%B",
+        ]
+        # stderr goes to a temp file so git can never block on a full stderr pipe
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(git_log_command, stdout=subprocess.PIPE, stderr=stderr_file)
+
+            pending = b""
+            for chunk in iter(lambda: process.stdout.read(1 << 16), b""):
+                pending += chunk
+                *records, pending = pending.split(b"\x00")
+                metrics.extend(parse_commit_record(record) for record in records)
+            if pending:
+                metrics.append(parse_commit_record(pending))
+
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode("utf-8", "replace")
+                raise RuntimeError(f"git log failed: {stderr.strip()}")
 
         return metrics
 
@@ -58,6 +88,49 @@ def calculate_git_metrics(repo_path):
         logger.exception("Failed to calculate Git metrics.")
         return []
 
+# Function to create the Azure DevOps connection, shared by every caller in the run
+@lru_cache(maxsize=None)
+def get_azure_connection(azure_org_url, pat):
+    """Authenticate and create a connection to Azure DevOps."""
+    credentials = BasicAuthentication("", pat)
+    return Connection(base_url=azure_org_url, creds=credentials)
+
+# Function to fetch one page of completed pull requests
+def fetch_pull_request_page(git_client, azure_project, skip):
+    """Fetch a page of completed pull requests in the project."""
+    search_criteria = GitPullRequestSearchCriteria(status="completed")
+    return git_client.get_pull_requests_by_project(azure_project, search_criteria, skip=skip, top=PR_PAGE_SIZE)
+
+# Function to connect and fetch the first page of the real pull request query
+def connect_and_fetch_first_page(azure_org_url, azure_project, pat):
+    """Connect to Azure DevOps and fetch the first page of completed pull requests."""
+    git_client = get_azure_connection(azure_org_url, pat).clients.get_git_client()
+    return git_client, list(fetch_pull_request_page(git_client, azure_project, 0))
+
+# Function to fetch every completed pull request, one page at a time in parallel
+def fetch_completed_pull_requests(git_client, azure_project, first_page):
+    """Fetch the remaining completed pull requests after the first page using concurrent paged requests."""
+    def fetch_page(skip):
+        return fetch_pull_request_page(git_client, azure_project, skip)
+
+    # Most projects fit in one page, so only fan out once the first page comes back full
+    prs = list(first_page)
+    skip = PR_PAGE_SIZE
+    if len(prs) < PR_PAGE_SIZE:
+        return prs
+
+    with ThreadPoolExecutor(max_workers=PR_FETCH_WORKERS) as executor:
+        while True:
+            # The total isn't known up front, so fetch pages in waves until one comes back short
+            pages = executor.map(fetch_page, range(skip, skip + PR_PAGE_SIZE * PR_FETCH_WORKERS, PR_PAGE_SIZE))
+            all_pages_full = True
+            for page in pages:
+                prs.extend(page)
+                all_pages_full = all_pages_full and len(page) == PR_PAGE_SIZE
+            if not all_pages_full:
+                return prs
+            skip += PR_PAGE_SIZE * PR_FETCH_WORKERS
+
 # Function to fetch PR metrics using Azure DevOps Python SDK
 def get_pr_metrics(azure_org_url, azure_project, pat):
     """Fetch Pull Request metrics from Azure DevOps."""
@@ -66,13 +139,9 @@ def get_pr_metrics(azure_org_url, azure_project, pat):
     try:
         logger.info("Fetching PR metrics from Azure DevOps...")
 
-        # Authenticate and create connection
-        credentials = BasicAuthentication("", pat)
-        connection = Connection(base_url=azure_org_url, creds=credentials)
-        git_client = connection.clients.get_git_client()
-
-        # Fetch pull requests
-        prs = git_client.get_pull_requests(azure_project, repository_id=None, status="completed")
+        # Connect and fetch pull requests, continuing from the first page
+        git_client, first_page = connect_and_fetch_first_page(azure_org_url, azure_project, pat)
+        prs = fetch_completed_pull_requests(git_client, azure_project, first_page)
         metrics = []
 
         for pr in prs:
@@ -104,13 +173,8 @@ def test_azure_connectivity(azure_org_url, azure_project, pat):
     try:
         logger.info("Testing connection to Azure DevOps Pull Requests API...")
 
-        # Authenticate and create connection
-        credentials = BasicAuthentication("", pat)
-        connection = Connection(base_url=azure_org_url, creds=credentials)
-        git_client = connection.clients.get_git_client()
-
-        # Attempt to fetch pull requests to test connectivity
-        prs = git_client.get_pull_requests(azure_project, repository_id=None, status="completed")
+        # Connectivity is proven by fetching the first page of the real query
+        _, prs = connect_and_fetch_first_page(azure_org_url, azure_project, pat)
         logger.info("Successfully connected to Azure DevOps and fetched pull requests.")
 
         for pr in prs: